@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 import json, random, time
 from typing import List, Optional
-from .participants_api import ROOMS, topics, votes
+from .participants_api import ROOMS, topics, votes, bump_room_version, unregister_topic, update_vote_counts
 from .ai_config import ai_config
 from .ai_client import ai_client
 from .ai_prompts import prompt_builder, topic_parser
@@ -435,6 +435,7 @@ async def clean_temp_topics(req: CleanTempTopicsRequest):
                 # 清理該主題的留言
                 if topic_id in topics:
                     del topics[topic_id]
+                    unregister_topic(req.room, topic_id)
                 
                 # 清理該主題的投票記錄
                 votes_to_delete = [
@@ -443,11 +444,13 @@ async def clean_temp_topics(req: CleanTempTopicsRequest):
                 ]
                 for vote_id in votes_to_delete:
                     del votes[vote_id]
+                    update_vote_counts(vote_id)
                 
                 cleaned_topics.append(topic_name)
                 print(f"✅ 已清理臨時主題: {topic_name}")
         
         if cleaned_topics:
+            bump_room_version(req.room)
             return {
                 "success": True,
                 "cleaned_topics": cleaned_topics,
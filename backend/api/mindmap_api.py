@@ -1,59 +1,69 @@
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import Response, ORJSONResponse
 from pydantic import BaseModel
+import asyncio
 import os
-import tempfile
+import re
 from datetime import datetime
 import json
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Optional
-from .participants_api import ROOMS, topics, votes
+from .participants_api import ROOMS, topics, ROOM_VERSION, TOPIC_VERSION, TOPICS_BY_ROOM, VOTE_COUNTS
 from .transparent_fusion import transparent_fusion
 from .ai_client import ai_client
+from utility.logger import get_logger
+
+logger = get_logger("mbbuddy.mindmap")
 
 router = APIRouter(prefix="/api/mindmap", tags=["mindmap"])
 
+# prompt 快取: (room_code, 房間資料版本) -> prompt 字串
+_PROMPT_CACHE_MAXSIZE = 128
+_PROMPT_CACHE = OrderedDict()
+
+# 沒有討論室與自訂內容時,嘗試讀取的預設 markdown 檔案位置
+_FALLBACK_MD_PATHS = (
+    "frontend/public/AIresult.txt",
+    "/app/frontend/public/AIresult.txt",
+    "../frontend/public/AIresult.txt"
+)
+
+# 找不到預設檔案時使用的示例
+_EXAMPLE_MD = """# AI心智圖示例
+## 人工智慧應用
+- 機器學習
+- 深度學習
+- 自然語言處理
+## 技術發展
+- 神經網路
+- 大型語言模型
+- 電腦視覺"""
+
+def _load_fallback_markdown():
+    """於模組載入時尋找並讀取預設 markdown 檔案 (靜態資源,執行期間不會變動)"""
+    path = next((p for p in _FALLBACK_MD_PATHS if os.path.exists(p)), None)
+    if path is None:
+        return None, None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return path, f.read()
+    except OSError as e:
+        logger.warning("⚠️ 讀取預設心智圖檔案 %s 失敗: %s", path, e)
+        return None, None
+
+_FALLBACK_MD_PATH, _FALLBACK_MD = _load_fallback_markdown()
+
+# Markdown 行解析: 第1組為標題的 #,第2組為標題文字,第3組為 - 列表項目文字
+_MD_LINE_RE = re.compile(r'^[^\S\n]*(?:(#+)[# ]*(.*)|-[- ]*(.*))$', re.M)
+
 class MindMapRequest(BaseModel):
     """心智圖生成請求模型"""
     room_code: Optional[str] = None  # 討論室代碼,如果提供則從討論室生成
     custom_content: Optional[str] = None  # 自訂內容,如果沒有討論室則使用
 
-def build_mindmap_prompt(room_code: str) -> str:
-    """構建心智圖生成的 prompt"""
-    if room_code not in ROOMS:
-        return None
-    
-    room_data = ROOMS[room_code]
-    prompt = f"""請為以下討論室的內容生成一個結構化的心智圖 Markdown 格式總結。"""
-    
-    # 獲取所有主題及其討論內容
-    room_topics = [(t_id, t) for t_id, t in topics.items() if t["room_id"] == room_code]
-    
-    if not room_topics:
-        prompt += "目前討論室還沒有任何主題。\n"
-        return prompt
-    
-    prompt += "討論主題與內容:\n\n"
-    
-    for topic_id, topic_data in room_topics:
-        topic_name = topic_data.get("topic_name", "未命名主題")
-        prompt += f"## 主題: {topic_name}\n\n"
-        
-        # 添加留言
-        if "comments" in topic_data and topic_data["comments"]:
-            prompt += "留言:\n"
-            for comment in topic_data["comments"]:
-                comment_id = comment.get("id")
-                nickname = comment.get("nickname", "匿名")
-                content = comment.get("content", "")
-                
-                # 獲取票數
-                good_votes = len(votes.get(comment_id, {}).get("good", []))
-                bad_votes = len(votes.get(comment_id, {}).get("bad", []))
-                
-                prompt += f"- {nickname}: {content} (👍{good_votes} 👎{bad_votes})\n"
-            prompt += "\n"
-    
-    prompt += """
+# prompt 結尾固定的格式要求
+_PROMPT_SUFFIX = """
 請根據以上內容,生成一個結構化的心智圖 Markdown 格式:
 
 要求:
@@ -78,32 +88,84 @@ def build_mindmap_prompt(room_code: str) -> str:
 
 請直接輸出 Markdown 格式,不要任何前綴說明:
 """
+
+def build_mindmap_prompt(room_code: str) -> str:
+    """構建心智圖生成的 prompt (依房間資料版本快取)"""
+    if room_code not in ROOMS:
+        return None
+    
+    key = (room_code, ROOM_VERSION.get(room_code, 0))
+    cached = _PROMPT_CACHE.get(key)
+    if cached is not None:
+        _PROMPT_CACHE.move_to_end(key)
+        return cached
     
+    prompt = _build_mindmap_prompt(room_code)
+    _PROMPT_CACHE[key] = prompt
+    if len(_PROMPT_CACHE) > _PROMPT_CACHE_MAXSIZE:
+        _PROMPT_CACHE.popitem(last=False)
     return prompt
 
+@lru_cache(maxsize=512)
+def _topic_section(topic_id: str, version: int) -> str:
+    """組合單一主題的 prompt 段落 (依主題版本號快取)"""
+    topic_data = topics[topic_id]
+    parts = [f"## 主題: {topic_data.get('topic_name', '未命名主題')}\n\n"]
+    add = parts.append
+    
+    # 添加留言
+    comments = topic_data.get("comments")
+    if comments:
+        add("留言:\n")
+        for comment in comments:
+            nickname = comment.get("nickname", "匿名")
+            content = comment.get("content", "")
+            
+            # 獲取票數
+            good_votes, bad_votes = VOTE_COUNTS.get(comment.get("id"), (0, 0))
+            
+            add(f"- {nickname}: {content} (👍{good_votes} 👎{bad_votes})\n")
+        add("\n")
+    
+    return "".join(parts)
+
+def _build_mindmap_prompt(room_code: str) -> str:
+    """實際組合 prompt 內容"""
+    parts = ["請為以下討論室的內容生成一個結構化的心智圖 Markdown 格式總結。"]
+    add = parts.append
+    
+    # 獲取所有主題及其討論內容
+    room_topic_ids = TOPICS_BY_ROOM.get(room_code)
+    
+    if not room_topic_ids:
+        add("目前討論室還沒有任何主題。\n")
+        return "".join(parts)
+    
+    add("討論主題與內容:\n\n")
+    
+    for topic_id in room_topic_ids:
+        add(_topic_section(topic_id, TOPIC_VERSION.get(topic_id, 0)))
+    
+    add(_PROMPT_SUFFIX)
+    
+    return "".join(parts)
+
 def parse_markdown_to_simple_structure(markdown_content):
     """將markdown文字解析為簡單結構以便測試"""
-    lines = markdown_content.strip().split('\n')
     structure = []
+    add = structure.append
     
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        if line.startswith('#'):
-            level = len(line) - len(line.lstrip('#'))
-            title = line.lstrip('# ').strip()
-            structure.append({
-                'level': level,
-                'title': title,
+    for hashes, title, content in _MD_LINE_RE.findall(markdown_content):
+        if hashes:
+            add({
+                'level': len(hashes),
+                'title': title.strip(),
                 'type': 'heading'
             })
-        elif line.startswith('-'):
-            content = line.lstrip('- ').strip()
-            structure.append({
+        else:
+            add({
                 'level': 0,
-                'title': content,
+                'title': content.strip(),
                 'type': 'item'
             })
     
@@ -111,65 +173,76 @@ def parse_markdown_to_simple_structure(markdown_content):
 
 def calculate_text_width(text, font_size):
     """計算文字寬度的更精確方法"""
-    # 根據不同字符類型計算寬度
-    chinese_chars = len([c for c in text if ord(c) > 127])
-    english_chars = len(text) - chinese_chars
+    # 根據不同字符類型計算寬度: 編碼為 ASCII 時被忽略的即為非 ASCII 字符
+    english_chars = len(text.encode('ascii', 'ignore'))
+    chinese_chars = len(text) - english_chars
     
     # 中文字符比英文字符更寬
-    chinese_width = chinese_chars * font_size * 0.9
-    english_width = english_chars * font_size * 0.6
-    
-    return chinese_width + english_width
+    return chinese_chars * font_size * 0.9 + english_chars * font_size * 0.6
 
+@lru_cache(maxsize=1024)
 def wrap_text(text, max_width, font_size):
-    """將長文字分行顯示"""
-    if calculate_text_width(text, font_size) <= max_width:
-        return [text]
+    """將長文字分行顯示,回傳 (各行文字 tuple, 最寬一行的寬度);結果會被快取"""
+    width = calculate_text_width(text, font_size)
+    if width <= max_width:
+        return (text,), width
     
-    words = text.split()
     lines = []
+    widest = 0
     current_line = ""
+    current_len = current_ascii = 0
+    current_width = 0
     
-    for word in words:
-        test_line = current_line + (" " if current_line else "") + word
-        if calculate_text_width(test_line, font_size) <= max_width:
-            current_line = test_line
-        else:
-            if current_line:
-                lines.append(current_line)
-            current_line = word
+    # 以整數字數累加 (與 calculate_text_width 同一算式),每個字只量測一次
+    for word in text.split():
+        word_len = len(word)
+        word_ascii = len(word.encode('ascii', 'ignore'))
+        if current_line:
+            test_len = current_len + 1 + word_len
+            test_ascii = current_ascii + 1 + word_ascii
+            test_width = (test_len - test_ascii) * font_size * 0.9 + test_ascii * font_size * 0.6
+            if test_width <= max_width:
+                current_line += " " + word
+                current_len, current_ascii, current_width = test_len, test_ascii, test_width
+                continue
+            lines.append(current_line)
+            if current_width > widest:
+                widest = current_width
+        current_line = word
+        current_len, current_ascii = word_len, word_ascii
+        current_width = (word_len - word_ascii) * font_size * 0.9 + word_ascii * font_size * 0.6
     
     if current_line:
         lines.append(current_line)
+        if current_width > widest:
+            widest = current_width
     
-    return lines if lines else [text]
+    return (tuple(lines), widest) if lines else ((text,), width)
 
-def create_simple_svg_mindmap(structure):
-    """創建向右延伸的優美SVG心智圖"""
-    width = 1200
-    height = 800
-    
-    # 定義顏色主題
-    colors = {
-        'background': '#f8fffe',
-        'main': '#2e7d6b',
-        'level1': '#4a9b8e',
-        'level2': '#7bb3a9',
-        'level3': '#a8cdc4',
-        'text': '#1a4037',
-        'line': '#4a9b8e'
-    }
-    
-    svg_content = f'''<?xml version="1.0" encoding="UTF-8"?>
+# 心智圖畫布尺寸與顏色主題
+_SVG_WIDTH = 1200
+_SVG_HEIGHT = 800
+_SVG_COLORS = {
+    'background': '#f8fffe',
+    'main': '#2e7d6b',
+    'level1': '#4a9b8e',
+    'level2': '#7bb3a9',
+    'level3': '#a8cdc4',
+    'text': '#1a4037',
+    'line': '#4a9b8e'
+}
+
+# SVG 開頭的 defs/style/背景 模板
+_SVG_HEADER_TMPL = '''<?xml version="1.0" encoding="UTF-8"?>
 <svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">
     <defs>
         <linearGradient id="mainGrad" x1="0%" y1="0%" x2="100%" y2="0%">
-            <stop offset="0%" style="stop-color:{colors['main']};stop-opacity:1" />
-            <stop offset="100%" style="stop-color:{colors['level1']};stop-opacity:1" />
+            <stop offset="0%" style="stop-color:{main};stop-opacity:1" />
+            <stop offset="100%" style="stop-color:{level1};stop-opacity:1" />
         </linearGradient>
         <linearGradient id="branchGrad" x1="0%" y1="0%" x2="100%" y2="0%">
-            <stop offset="0%" style="stop-color:{colors['level1']};stop-opacity:1" />
-            <stop offset="100%" style="stop-color:{colors['level2']};stop-opacity:1" />
+            <stop offset="0%" style="stop-color:{level1};stop-opacity:1" />
+            <stop offset="100%" style="stop-color:{level2};stop-opacity:1" />
         </linearGradient>
         <filter id="shadow" x="-20%" y="-20%" width="140%" height="140%">
             <feDropShadow dx="2" dy="2" stdDeviation="3" flood-opacity="0.3"/>
@@ -179,13 +252,52 @@ def create_simple_svg_mindmap(structure):
     <style>
         .main-title {{ font-family: 'Arial', sans-serif; font-size: 18px; font-weight: bold; fill: white; }}
         .branch-title {{ font-family: 'Arial', sans-serif; font-size: 14px; font-weight: 600; fill: white; }}
-        .item-text {{ font-family: 'Arial', sans-serif; font-size: 11px; fill: {colors['text']}; }}
-        .connector {{ stroke: {colors['line']}; stroke-width: 2; fill: none; }}
+        .item-text {{ font-family: 'Arial', sans-serif; font-size: 11px; fill: {text}; }}
+        .connector {{ stroke: {line}; stroke-width: 2; fill: none; }}
     </style>
     
     <!-- 背景 -->
-    <rect width="{width}" height="{height}" fill="{colors['background']}"/>
+    <rect width="{width}" height="{height}" fill="{background}"/>
 '''
+
+# 尺寸與顏色皆固定,開頭區塊在載入模組時就組好
+_SVG_PREFIX = _SVG_HEADER_TMPL.format_map(dict(_SVG_COLORS, width=_SVG_WIDTH, height=_SVG_HEIGHT))
+
+# 各圖形節點的預編譯模板 (綁定 format_map,迴圈內只需代入座標)
+_MAIN_RECT_TMPL = '''
+    <!-- 主標題 -->
+    <rect x="{x}" y="{y}" 
+          width="{w}" height="{h}" 
+          fill="url(#mainGrad)" rx="25" filter="url(#shadow)"/>
+'''.format_map
+_MAIN_TEXT_TMPL = '<text x="{x}" y="{y}" text-anchor="middle" class="main-title">{text}</text>\n'.format_map
+_CONNECTOR_TMPL = '''
+    <path d="M {x1} {y1} Q {x2} {y1} {x2} {y2}" class="connector"/>
+    <line x1="{x2}" y1="{y2}" x2="{x3}" y2="{y2}" class="connector"/>
+'''.format_map
+_BRANCH_RECT_TMPL = '''
+    <rect x="{x}" y="{y}" 
+          width="{w}" height="{h}" 
+          fill="url(#branchGrad)" rx="17" filter="url(#shadow)"/>
+'''.format_map
+_BRANCH_TEXT_TMPL = '<text x="{x}" y="{y}" text-anchor="middle" class="branch-title">{text}</text>\n'.format_map
+_ITEM_LINE_TMPL = '''
+    <line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" class="connector" stroke-width="1"/>
+'''.format_map
+_ITEM_RECT_TMPL = '''
+    <rect x="{x}" y="{y}" 
+          width="{w}" height="{h}" 
+          fill="{fill}" stroke="{stroke}" stroke-width="1" rx="10" opacity="0.9"/>
+'''.format_map
+_ITEM_TEXT_TMPL = '<text x="{x}" y="{y}" class="item-text">{text}</text>\n'.format_map
+
+def create_simple_svg_mindmap(structure):
+    """創建向右延伸的優美SVG心智圖"""
+    height = _SVG_HEIGHT
+    parts = [_SVG_PREFIX]
+    add = parts.append
+    c_level3 = _SVG_COLORS['level3']
+    c_level2 = _SVG_COLORS['level2']
     
     # 處理結構數據並創建佈局
     main_topics = []
@@ -231,219 +343,227 @@ def create_simple_svg_mindmap(structure):
     
     # 繪製主要標題（左側）
     if main_topics:
+        _wrap = wrap_text
         main_topic = main_topics[0]
         main_y = height // 2
         main_x = 100
         
-        # 主標題框 - 使用更精確的文字寬度計算
-        main_title_lines = wrap_text(main_topic['title'], 300, 18)
-        title_width = max(160, max(calculate_text_width(line, 18) for line in main_title_lines) + 40)
+        # 主標題框 - 換行時順便取得最寬一行的寬度
+        main_title_lines, main_text_width = _wrap(main_topic['title'], 300, 18)
+        title_width = max(160, main_text_width + 40)
         title_height = max(50, len(main_title_lines) * 22 + 10)
         
-        svg_content += f'''
-    <!-- 主標題 -->
-    <rect x="{main_x - title_width//2}" y="{main_y - title_height//2}" 
-          width="{title_width}" height="{title_height}" 
-          fill="url(#mainGrad)" rx="25" filter="url(#shadow)"/>
-'''
+        add(_MAIN_RECT_TMPL({
+            'x': main_x - title_width//2, 'y': main_y - title_height//2,
+            'w': title_width, 'h': title_height
+        }))
         
         # 渲染多行文字
-        for i, line in enumerate(main_title_lines):
-            line_y = main_y - (len(main_title_lines) - 1) * 11 + i * 22
-            svg_content += f'<text x="{main_x}" y="{line_y + 5}" text-anchor="middle" class="main-title">{line}</text>\n'
+        text_y = main_y - (len(main_title_lines) - 1) * 11 + 5
+        for line in main_title_lines:
+            add(_MAIN_TEXT_TMPL({'x': main_x, 'y': text_y, 'text': line}))
+            text_y += 22
         
         # 繪製分支主題
-        branch_start_x = main_x + title_width//2 + 50
+        main_right_x = main_x + title_width//2
+        branch_start_x = main_right_x + 50
+        branch_joint_x = branch_start_x - 20
         total_branches = len(main_topic['subtopics'])
         
         if total_branches > 0:
             branch_spacing = min(150, (height - 200) // total_branches)
             start_y = main_y - (total_branches - 1) * branch_spacing // 2
             
-            for i, subtopic in enumerate(main_topic['subtopics']):
-                branch_y = start_y + i * branch_spacing
+            # 第一階段: 先計算所有分支與子項目的版面 (各欄位分開存放)
+            branch_ys = []
+            branch_lines = []
+            branch_widths = []
+            branch_heights = []
+            item_lines = []
+            item_ys = []
+            item_widths = []
+            item_heights = []
+            
+            branch_y = start_y
+            for subtopic in main_topic['subtopics']:
                 # 使用更精確的文字寬度計算和文字換行
-                branch_title_lines = wrap_text(subtopic['title'], 200, 14)
-                branch_width = max(120, max(calculate_text_width(line, 14) for line in branch_title_lines) + 30)
-                branch_height = max(35, len(branch_title_lines) * 18 + 10)
+                lines, text_width = _wrap(subtopic['title'], 200, 14)
+                branch_ys.append(branch_y)
+                branch_lines.append(lines)
+                branch_widths.append(max(120, text_width + 30))
+                branch_heights.append(max(35, len(lines) * 18 + 10))
+                
+                cur_lines = []
+                cur_widths = []
+                cur_heights = []
+                for item in subtopic['items'][:5]:  # 限制顯示5個項目
+                    lines, text_width = _wrap(item, 150, 11)
+                    cur_lines.append(lines)
+                    cur_widths.append(max(100, text_width + 20))
+                    cur_heights.append(max(20, len(lines) * 14 + 6))
+                item_lines.append(cur_lines)
+                # 增加間距以容納多行文字
+                item_ys.append(range(branch_y - 60, branch_y - 60 + 30 * len(cur_lines), 30))
+                item_widths.append(cur_widths)
+                item_heights.append(cur_heights)
+                
+                branch_y += branch_spacing
+            
+            # 第二階段: 依計算好的座標輸出 SVG
+            for (branch_y, title_lines, branch_width, branch_height,
+                 b_item_lines, b_item_ys, b_item_widths, b_item_heights) in zip(
+                    branch_ys, branch_lines, branch_widths, branch_heights,
+                    item_lines, item_ys, item_widths, item_heights):
+                branch_right_x = branch_start_x + branch_width
                 
                 # 連接線
-                svg_content += f'''
-    <path d="M {main_x + title_width//2} {main_y} Q {branch_start_x - 20} {main_y} {branch_start_x - 20} {branch_y}" class="connector"/>
-    <line x1="{branch_start_x - 20}" y1="{branch_y}" x2="{branch_start_x}" y2="{branch_y}" class="connector"/>
-'''
+                add(_CONNECTOR_TMPL({
+                    'x1': main_right_x, 'y1': main_y,
+                    'x2': branch_joint_x, 'y2': branch_y, 'x3': branch_start_x
+                }))
                 
                 # 分支標題框
-                svg_content += f'''
-    <rect x="{branch_start_x}" y="{branch_y - branch_height//2}" 
-          width="{branch_width}" height="{branch_height}" 
-          fill="url(#branchGrad)" rx="17" filter="url(#shadow)"/>
-'''
+                add(_BRANCH_RECT_TMPL({
+                    'x': branch_start_x, 'y': branch_y - branch_height//2,
+                    'w': branch_width, 'h': branch_height
+                }))
                 
                 # 渲染多行分支標題文字
-                for j, line in enumerate(branch_title_lines):
-                    line_y = branch_y - (len(branch_title_lines) - 1) * 9 + j * 18
-                    svg_content += f'<text x="{branch_start_x + branch_width//2}" y="{line_y + 4}" text-anchor="middle" class="branch-title">{line}</text>\n'
+                text_x = branch_start_x + branch_width//2
+                text_y = branch_y - (len(title_lines) - 1) * 9 + 4
+                for line in title_lines:
+                    add(_BRANCH_TEXT_TMPL({'x': text_x, 'y': text_y, 'text': line}))
+                    text_y += 18
                 
                 # 繪製子項目
-                item_start_x = branch_start_x + branch_width + 30
-                for j, item in enumerate(subtopic['items'][:5]):  # 限制顯示5個項目
-                    item_y = branch_y + (j - 2) * 30  # 增加間距以容納多行文字
-                    # 使用更精確的文字寬度計算和文字換行
-                    item_lines = wrap_text(item, 150, 11)
-                    item_width = max(100, max(calculate_text_width(line, 11) for line in item_lines) + 20)
-                    item_height = max(20, len(item_lines) * 14 + 6)
-                    
+                item_start_x = branch_right_x + 30
+                item_text_x = item_start_x + 10
+                for lines, item_y, item_width, item_height in zip(b_item_lines, b_item_ys, b_item_widths, b_item_heights):
                     # 連接線到項目
-                    svg_content += f'''
-    <line x1="{branch_start_x + branch_width}" y1="{branch_y}" x2="{item_start_x}" y2="{item_y}" class="connector" stroke-width="1"/>
-'''
+                    add(_ITEM_LINE_TMPL({
+                        'x1': branch_right_x, 'y1': branch_y,
+                        'x2': item_start_x, 'y2': item_y
+                    }))
                     
                     # 項目框
-                    svg_content += f'''
-    <rect x="{item_start_x}" y="{item_y - item_height//2}" 
-          width="{item_width}" height="{item_height}" 
-          fill="{colors['level3']}" stroke="{colors['level2']}" stroke-width="1" rx="10" opacity="0.9"/>
-'''
+                    add(_ITEM_RECT_TMPL({
+                        'x': item_start_x, 'y': item_y - item_height//2,
+                        'w': item_width, 'h': item_height,
+                        'fill': c_level3, 'stroke': c_level2
+                    }))
                     
                     # 渲染多行項目文字
-                    for k, line in enumerate(item_lines):
-                        line_y = item_y - (len(item_lines) - 1) * 7 + k * 14
-                        svg_content += f'<text x="{item_start_x + 10}" y="{line_y + 3}" class="item-text">{line}</text>\n'
+                    text_y = item_y - (len(lines) - 1) * 7 + 3
+                    for line in lines:
+                        add(_ITEM_TEXT_TMPL({'x': item_text_x, 'y': text_y, 'text': line}))
+                        text_y += 14
     
-    svg_content += '</svg>'
-    return svg_content
+    add('</svg>')
+    return ''.join(parts)
 
 @router.post("/generate")
 async def generate_mindmap(request: MindMapRequest = None):
     """生成心智圖 - 支援從討論室 AI 生成或使用自訂內容"""
     try:
-        print(f"📊 收到心智圖生成請求: {request}")
+        logger.debug("📊 收到心智圖生成請求: %s", request)
         markdown_content = None
+        # CPU 運算交給執行緒池,避免阻塞事件迴圈
+        loop = asyncio.get_event_loop()
         
         # 優先使用討論室代碼生成
         if request and request.room_code:
             room_code = request.room_code
-            print(f"🏠 使用討論室代碼: {room_code}")
+            logger.debug("🏠 使用討論室代碼: %s", room_code)
             
             # 檢查討論室是否存在
-            if room_code not in ROOMS:
-                print(f"❌ 找不到討論室: {room_code}")
+            room_data = ROOMS.get(room_code)
+            if room_data is None:
+                logger.warning("❌ 找不到討論室: %s", room_code)
                 raise HTTPException(status_code=404, detail=f"找不到討論室: {room_code}")
             
             # 構建 prompt
             prompt = build_mindmap_prompt(room_code)
             if not prompt:
-                print(f"❌ 無法構建 prompt")
+                logger.warning("❌ 無法構建 prompt")
                 raise HTTPException(status_code=400, detail="無法構建心智圖 prompt")
             
-            print(f"📝 已構建 prompt, 長度: {len(prompt)}")
+            logger.debug("📝 已構建 prompt, 長度: %d", len(prompt))
             
             # 使用 AI 生成心智圖 markdown
             try:
-                room_data = ROOMS[room_code]
                 workspace_slug = room_data.get('workspace_slug')
                 
                 if not workspace_slug:
-                    print(f"⚠️ 討論 {room_code} 沒有預設workspace,正在創建...")
+                    logger.warning("⚠️ 討論 %s 沒有預設workspace,正在創建...", room_code)
                     workspace_slug = await ai_client.ensure_workspace_exists(
                         room_code, 
                         room_data.get('title', f'討論室-{room_code}')
                     )
-                    ROOMS[room_code]['workspace_slug'] = workspace_slug
+                    room_data['workspace_slug'] = workspace_slug
                 
-                print(f"🤖 使用 AI 生成心智圖 for 討論室: {room_code}, workspace: {workspace_slug}")
+                logger.debug("🤖 使用 AI 生成心智圖 for 討論室: %s, workspace: %s", room_code, workspace_slug)
                 markdown_content = await transparent_fusion.process_request(
                     prompt, 
                     workspace_slug, 
                     task_type="mindmap"
                 )
                 
-                print(f"✅ AI 生成成功, markdown 長度: {len(markdown_content)}")
+                logger.debug("✅ AI 生成成功, markdown 長度: %d", len(markdown_content))
                 
                 # 清理可能的 markdown 代碼塊標記
                 markdown_content = markdown_content.strip()
                 if markdown_content.startswith('```'):
                     lines = markdown_content.split('\n')
                     markdown_content = '\n'.join(lines[1:-1]) if len(lines) > 2 else markdown_content
-                    print(f"🧹 已清理 markdown 代碼塊標記")
+                    logger.debug("🧹 已清理 markdown 代碼塊標記")
                     
             except Exception as e:
-                print(f"❌ AI 生成失敗: {str(e)}, 使用預設內容")
-                markdown_content = f"""# {ROOMS[room_code].get('title', '討論總結')}"""
+                logger.warning("❌ AI 生成失敗: %s, 使用預設內容", e)
+                markdown_content = f"""# {room_data.get('title', '討論總結')}"""
         
         # 其次使用自訂內容
         elif request and request.custom_content:
-            print(f"📄 使用自訂內容")
+            logger.debug("📄 使用自訂內容")
             markdown_content = request.custom_content
         
-        # 最後嘗試從檔案讀取
+        # 最後使用預設檔案 (已於載入時讀取)
+        elif _FALLBACK_MD is not None:
+            logger.debug("📂 使用預設檔案內容: %s", _FALLBACK_MD_PATH)
+            markdown_content = _FALLBACK_MD
         else:
-            print(f"📂 嘗試從檔案讀取")
-            possible_paths = [
-                "frontend/public/AIresult.txt",
-                "/app/frontend/public/AIresult.txt",
-                "../frontend/public/AIresult.txt"
-            ]
-            
-            file_path = None
-            for path in possible_paths:
-                if os.path.exists(path):
-                    file_path = path
-                    break
-            
-            if file_path:
-                print(f"✅ 找到檔案: {file_path}")
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    markdown_content = f.read()
-            else:
-                print(f"⚠️ 未找到檔案,使用預設示例")
-                # 預設示例
-                markdown_content = """# AI心智圖示例
-## 人工智慧應用
-- 機器學習
-- 深度學習
-- 自然語言處理
-## 技術發展
-- 神經網路
-- 大型語言模型
-- 電腦視覺"""
+            logger.warning("⚠️ 未找到檔案,使用預設示例")
+            markdown_content = _EXAMPLE_MD
         
-        print(f"🔄 開始解析 markdown...")
+        logger.debug("🔄 開始解析 markdown...")
         # 解析markdown為簡單結構
-        structure = parse_markdown_to_simple_structure(markdown_content)
+        structure = await loop.run_in_executor(None, parse_markdown_to_simple_structure, markdown_content)
         
         if not structure:
-            print(f"❌ 無法解析 markdown 內容")
+            logger.warning("❌ 無法解析 markdown 內容")
             raise HTTPException(status_code=400, detail="無法解析markdown內容")
         
-        print(f"✅ 解析成功,結構元素數量: {len(structure)}")
+        logger.debug("✅ 解析成功,結構元素數量: %d", len(structure))
         
         # 創建SVG心智圖
-        print(f"🎨 開始創建 SVG...")
-        svg_content = create_simple_svg_mindmap(structure)
-        print(f"✅ SVG 創建成功,長度: {len(svg_content)}")
+        logger.debug("🎨 開始創建 SVG...")
+        svg_content = await loop.run_in_executor(None, create_simple_svg_mindmap, structure)
+        logger.debug("✅ SVG 創建成功,長度: %d", len(svg_content))
         
-        # 保存到臨時檔案
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.svg', mode='w', encoding='utf-8') as tmp_file:
-            tmp_file.write(svg_content)
-            print(f"💾 已保存到臨時檔案: {tmp_file.name}")
-            
-            return FileResponse(
-                tmp_file.name,
-                media_type='image/svg+xml',
-                filename=f'mindmap_{datetime.now().strftime("%Y%m%d_%H%M%S")}.svg'
-            )
+        # 直接從記憶體回傳,不再寫入臨時檔案
+        filename = f'mindmap_{datetime.now().strftime("%Y%m%d_%H%M%S")}.svg'
+        return Response(
+            content=svg_content.encode('utf-8'),
+            media_type='image/svg+xml',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
             
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ 生成心智圖時發生錯誤: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ 生成心智圖時發生錯誤: %s", e)
         raise HTTPException(status_code=500, detail=f"生成心智圖時發生錯誤: {str(e)}")
 
-@router.post("/preview")
+@router.post("/preview", response_class=ORJSONResponse)
 async def preview_mindmap_markdown(request: MindMapRequest):
     """預覽心智圖的 Markdown 內容 (用於測試和調試)"""
     try:
@@ -452,7 +572,8 @@ async def preview_mindmap_markdown(request: MindMapRequest):
         
         room_code = request.room_code
         
-        if room_code not in ROOMS:
+        room_data = ROOMS.get(room_code)
+        if room_data is None:
             raise HTTPException(status_code=404, detail=f"找不到討論室: {room_code}")
         
         # 構建 prompt
@@ -461,7 +582,6 @@ async def preview_mindmap_markdown(request: MindMapRequest):
             raise HTTPException(status_code=400, detail="無法構建心智圖 prompt")
         
         # 使用 AI 生成心智圖 markdown
-        room_data = ROOMS[room_code]
         workspace_slug = room_data.get('workspace_slug')
         
         if not workspace_slug:
@@ -469,7 +589,7 @@ async def preview_mindmap_markdown(request: MindMapRequest):
                 room_code, 
                 room_data.get('title', f'討論室-{room_code}')
             )
-            ROOMS[room_code]['workspace_slug'] = workspace_slug
+            room_data['workspace_slug'] = workspace_slug
         
         markdown_content = await transparent_fusion.process_request(
             prompt, 
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException, Body
 from pydantic import BaseModel
 from typing import Optional, List
-import random, string, time, uuid
+import random, string, time, uuid, itertools
+from collections import defaultdict
 import platform
 import os
 from reportlab.pdfbase import pdfmetrics
@@ -199,6 +200,73 @@ votes = {}
 }
 """
 
+VOTE_COUNTS = {}
+"""
+{
+    comment_id: (good_count, bad_count)  # 與 votes 同步維護的票數
+}
+"""
+
+def update_vote_counts(comment_id):
+    """依 votes 重新同步該留言的票數 (投票資料變動後呼叫)"""
+    comment_votes = votes.get(comment_id)
+    if comment_votes is None:
+        VOTE_COUNTS.pop(comment_id, None)
+    else:
+        VOTE_COUNTS[comment_id] = (len(comment_votes["good"]), len(comment_votes["bad"]))
+
+ROOM_VERSION = {}
+"""
+{
+    room_id: int  # 主題、留言或投票每次變動時遞增，供心智圖 prompt 快取判斷是否失效
+}
+"""
+
+def bump_room_version(room_id):
+    """遞增房間資料版本號 (主題、留言、投票有變動時呼叫)"""
+    ROOM_VERSION[room_id] = ROOM_VERSION.get(room_id, 0) + 1
+
+TOPIC_VERSION = {}
+"""
+{
+    topic_id: int  # 主題名稱、留言或投票變動時更新 (全域遞增,不會重複),供心智圖 prompt 的主題段落快取使用
+}
+"""
+
+_topic_version_counter = itertools.count(1)
+
+def bump_topic_version(topic_id):
+    """更新主題資料版本號"""
+    TOPIC_VERSION[topic_id] = next(_topic_version_counter)
+
+TOPICS_BY_ROOM = defaultdict(list)
+"""
+{
+    room_id: [topic_id1, topic_id2, ...]  # 依加入 topics 的順序排列
+}
+"""
+
+def register_topic(room_id, topic_id):
+    """將主題加入房間索引 (新增至 topics 後呼叫)"""
+    room_topic_ids = TOPICS_BY_ROOM[room_id]
+    if topic_id not in room_topic_ids:
+        room_topic_ids.append(topic_id)
+    bump_topic_version(topic_id)
+
+def unregister_topic(room_id, topic_id):
+    """將主題自房間索引移除 (自 topics 刪除後呼叫)"""
+    room_topic_ids = TOPICS_BY_ROOM.get(room_id)
+    if room_topic_ids and topic_id in room_topic_ids:
+        room_topic_ids.remove(topic_id)
+    TOPIC_VERSION.pop(topic_id, None)
+
+def find_comment_topic(room_id, comment_id):
+    """回傳留言所屬的主題 ID,找不到時回傳 None"""
+    for topic_id in TOPICS_BY_ROOM.get(room_id, ()):
+        if any(c["id"] == comment_id for c in topics[topic_id]["comments"]):
+            return topic_id
+    return None
+
 class RoomCreate(BaseModel):
     title: str
     topics: List[str] # 改為接收 topics 列表
@@ -276,11 +344,14 @@ async def create_room(room: RoomCreate):
         topic_name_stripped = topic_name.strip()
         if not topic_name_stripped:
             continue
-        topics[f"{code}_{topic_name_stripped}"] = {
+        topic_id = f"{code}_{topic_name_stripped}"
+        topics[topic_id] = {
             "room_id": code,
             "topic_name": topic_name_stripped,
             "comments": [],
         }
+        register_topic(code, topic_id)
+    bump_room_version(code)
     
     return {
         "code": ROOMS[code]["code"],
@@ -328,6 +399,7 @@ def add_topics_to_room(req: AddTopicsRequest):
     default_topic_id = f"{req.room}_預設主題"
     if default_topic_id in topics:
         del topics[default_topic_id]
+        unregister_topic(req.room, default_topic_id)
 
     # 2. 添加新主題
     for topic_name in req.topics:
@@ -342,7 +414,10 @@ def add_topics_to_room(req: AddTopicsRequest):
                 "topic_name": topic_name_stripped,
                 "comments": [],
             }
+            register_topic(req.room, topic_id)
     
+    bump_room_version(req.room)
+
     # 3. 更新房間的 current_topic 為新的第一個主題
     if req.topics:
         ROOMS[req.room]["current_topic"] = req.topics[0].strip()
@@ -600,6 +675,8 @@ def set_room_state(room: str = Body(...),
             "topic_name": topic,
             "comments": []
         }
+        register_topic(room, topic_id)
+        bump_room_version(room)
     return {"success": True, "status": "Discussion"}
 
 # 取得主題、倒數、留言 (RESTful 風格)
@@ -684,6 +761,7 @@ def add_comment(room: str, data: CommentRequest):
             "topic_name": current_topic,
             "comments": []
         }
+        register_topic(room, topic_id)
     
     # 取得提交者的 device_id
     # 這是一個簡化的假設，正式產品中應有更安全的驗證
@@ -705,6 +783,8 @@ def add_comment(room: str, data: CommentRequest):
     }
     
     topics[topic_id]["comments"].append(new_comment)
+    bump_topic_version(topic_id)
+    bump_room_version(room)
     return {"success": True, "comment_id": comment_id}
 
 # 取得所有留言 (RESTful 風格)
@@ -780,6 +860,7 @@ def delete_comment_single(room: str, comment_id: str):
         if idx is not None:
             affected_topic_name = topic_obj.get("topic_name", "")
             comments_list.pop(idx)
+            bump_topic_version(topic_key)
             found = True
             break
 
@@ -788,6 +869,8 @@ def delete_comment_single(room: str, comment_id: str):
 
     if comment_id in votes:
         del votes[comment_id]
+        update_vote_counts(comment_id)
+    bump_room_version(room)
 
     return {"success": True}
 
@@ -823,12 +906,8 @@ def vote_comment(room: str, comment_id: str, data: VoteRequest):
     if not ROOMS[room].get("settings", {}).get("allowVoting", True):
         raise HTTPException(status_code=403, detail="主持人已關閉投票功能")
 
-    comment_found = any(
-        c["id"] == comment_id 
-        for t in topics.values() if t["room_id"] == room 
-        for c in t["comments"]
-    )
-    if not comment_found:
+    comment_topic_id = find_comment_topic(room, comment_id)
+    if comment_topic_id is None:
         raise HTTPException(status_code=404, detail="Comment not found")
     
     if comment_id not in votes:
@@ -842,6 +921,9 @@ def vote_comment(room: str, comment_id: str, data: VoteRequest):
         votes[comment_id][opposite_type].remove(device_id)
     
     votes[comment_id][vote_type].append(device_id)
+    update_vote_counts(comment_id)
+    bump_topic_version(comment_topic_id)
+    bump_room_version(room)
     
     return {"success": True}
 
@@ -881,6 +963,11 @@ def remove_vote_comment(room: str, comment_id: str, data: VoteRequest):
         raise HTTPException(status_code=404, detail="Vote not found")
     
     votes[comment_id][vote_type].remove(device_id)
+    update_vote_counts(comment_id)
+    comment_topic_id = find_comment_topic(room, comment_id)
+    if comment_topic_id is not None:
+        bump_topic_version(comment_topic_id)
+    bump_room_version(room)
     
     return {"success": True}
 
@@ -961,11 +1048,13 @@ def update_participant_nickname(room: str, device_id: str, data: UpdateNicknameR
         raise HTTPException(status_code=404, detail="參與者不存在")
     
     # 2. *** 重要：使用 device_id 更新該用戶所有留言的暱稱 ***
-    for topic in topics.values():
+    for topic_id, topic in topics.items():
         if topic["room_id"] == room:
             for comment in topic["comments"]:
                 if comment.get("device_id") == device_id:
                     comment["nickname"] = new_nickname
+                    bump_topic_version(topic_id)
+    bump_room_version(room)
     
     return {"success": True, "message": "暱稱已更新"}
 
@@ -1003,6 +1092,8 @@ def update_current_topic(room: str, data: TopicUpdateRequest):
             "topic_name": new_topic,
             "comments": []
         }
+        register_topic(room, topic_id)
+        bump_room_version(room)
 
     ROOMS[room]["current_topic"] = new_topic
     ROOMS[room]["status"] = "Discussion" # 切換主題時自動進入討論狀態
@@ -1040,6 +1131,9 @@ def rename_topic(room: str, data: RenameTopicRequest):
     topic_data = topics.pop(old_topic_id)
     topic_data['topic_name'] = new_topic_name
     topics[new_topic_id] = topic_data
+    unregister_topic(room, old_topic_id)
+    register_topic(room, new_topic_id)
+    bump_room_version(room)
 
     # 檢查是否為當前主題
     is_current = (ROOMS[room].get("current_topic") == old_topic_name)
@@ -1070,9 +1164,12 @@ async def delete_room_topic(room_code: str, topic_title: str):
     for comment_id in comment_ids_to_delete:
         if comment_id in votes:
             del votes[comment_id]
+            update_vote_counts(comment_id)
 
     # 3. 刪除主題本身
     del topics[topic_id_to_delete]
+    unregister_topic(room_code, topic_id_to_delete)
+    bump_room_version(room_code)
 
     # 4. 如果被刪除的是當前主題，則更新房間的當前主題
     if room.get("current_topic") == topic_title:
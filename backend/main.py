@@ -3,6 +3,7 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from api import ai_api
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from api import participants_api
 from api import network_api
 from api import mindmap_api
@@ -102,6 +103,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 壓縮較大的回應 (如心智圖 SVG)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 app.include_router(participants_api.router)
 app.include_router(ai_api.router)
 app.include_router(network_api.router)
@@ -110,4 +114,5 @@ app.include_router(hostStyle_api.router)
 
 if __name__ == "__main__":
     import uvicorn
+    # loop/http 使用預設的 auto: 有安裝 uvloop/httptools 時會自動採用
     uvicorn.run("main:app", host="0.0.0.0", port=8001, reload=True)